@@ -9,22 +9,25 @@ Workflow:
     1. Checks system prerequisites (Python, Tor, required packages)
     2. Searches DuckDuckGo for YouTube content via Tor proxy
     3. Saves discovered URLs to urls.txt (overwrites on each run)
-    4. Downloads media with automatic Tor identity rotation before each download
+    4. Downloads media with each URL on its own Tor circuit, transcoding audio
+       on a separate thread while the next URL downloads
     5. Creates subdirectories conditionally based on user selections
 
 Features:
     - Multiple audio format support (MP3, AAC, FLAC, WAV, OGG, Opus, M4A, custom)
     - Video download in MP4 format
     - Optional transcript extraction
-    - Tor identity rotation for enhanced privacy
+    - Per-URL Tor circuit isolation for enhanced privacy
+    - Parallel downloads (GHOSTTUBE_WORKERS, default 4)
+    - Optional exit-IP logging for each URL's circuit (GHOSTTUBE_VERIFY_IP=1)
     - Organized output structure with query-based subdirectories
 
 Requirements:
     - Python 3.7+
     - Tor service running with:
-        * SOCKS proxy on 127.0.0.1:9050
-        * ControlPort 9051
-        * CookieAuthentication enabled
+        * SOCKS proxy on 127.0.0.1:9050 (IsolateSOCKSAuth, Tor's default)
+    - ffmpeg on PATH (audio conversion and video merging)
+    - ripper_core.py (shared paths and helpers) in the same folder
     - Internet connection
     - Sufficient disk space for downloads
 
@@ -34,92 +37,103 @@ Version: 2.0
 
 import os
 import sys
+import json
+import hashlib
+import importlib.util
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import re
-import urllib.parse
+import secrets
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from urllib.parse import quote_plus
-from stem import Signal
-from stem.control import Controller
+
+# Paths and helpers shared with ghosttube.py and yt-dlp-media-ripper.py
+from ripper_core import (
+    VENV_DIR, PIP_BIN, OUTPUT_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS,
+    URLS_FILE, env_int, sanitize_query_for_dir, print_header, create_venv,
+    activate_venv, save_urls_to_file, is_subtitle_error, exit_suspect,
+)
 
 # ============================================================================
 # CONFIGURATION CONSTANTS
 # ============================================================================
 
 # Tor proxy configuration for routing all traffic through Tor network
-TOR_PROXY = 'socks5://127.0.0.1:9050'  # SOCKS5 proxy address
-TOR_CONTROL_PORT = 9051                 # Port for Tor control commands
+TOR_SOCKS_ADDR = '127.0.0.1:9050'      # Tor SOCKS listener
+TOR_PROXY = f'socks5://{TOR_SOCKS_ADDR}'  # SOCKS5 proxy address
 PROXIES = {
     'http': TOR_PROXY,   # Route HTTP traffic through Tor
     'https': TOR_PROXY   # Route HTTPS traffic through Tor
 }
+RUN_ID = secrets.token_hex(4)           # Keeps SOCKS credentials unique per run
 
-# Directory structure for the application
-SCRIPT_DIR = Path.cwd()                              # Current working directory
-VENV_DIR = SCRIPT_DIR / ".venv"                     # Python virtual environment
-OUTPUT_DIR = SCRIPT_DIR / "output"                  # Root output directory
-OUTPUT_AUDIO = OUTPUT_DIR / "audio"                 # Audio files storage
-OUTPUT_VIDEO = OUTPUT_DIR / "video"                 # Video files storage
-OUTPUT_TRANSCRIPTS = OUTPUT_DIR / "transcripts"     # Transcript files storage
-URLS_FILE = SCRIPT_DIR / "urls.txt"                 # URL collection file
+# Shared HTTP session for direct requests made through Tor. Keep-alive
+# connections are pooled so repeated calls skip the TCP + SOCKS + TLS
+# handshake over the (slow) Tor circuit.
+SESSION = requests.Session()
+SESSION.proxies.update(PROXIES)
+SESSION.headers.update({
+    # Use a common browser user agent to avoid being blocked
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
 
+# Directory structure (.venv, output/*, urls.txt) comes from ripper_core
+DIRS_MARKER = OUTPUT_DIR / ".initialized"           # Directory setup already done
 
-# ============================================================================
-# UTILITY FUNCTIONS
-# ============================================================================
+# pip self-upgrade is attempted at most once per interval
+PIP_CHECK_MARKER = VENV_DIR / ".pip_checked"        # mtime = last upgrade attempt
+PIP_CHECK_INTERVAL = 24 * 60 * 60                   # Seconds between upgrades
 
-def sanitize_query_for_dir(query):
-    """
-    Sanitize a search query string to create a valid directory name.
-    
-    Removes or replaces characters that are invalid in directory names across
-    different operating systems (Windows, macOS, Linux).
-    
-    Args:
-        query (str): The raw search query string from user input
-        
-    Returns:
-        str: A sanitized string safe for use as a directory name
-        
-    Example:
-        >>> sanitize_query_for_dir("Kiss: Greatest Hits")
-        'Kiss_Greatest_Hits'
-    """
-    # Remove invalid filesystem characters: < > : " / \ | ? *
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', query)
-    
-    # Replace spaces with underscores for cleaner directory names
-    sanitized = sanitized.replace(' ', '_').strip()
-    
-    # Fallback to generic name if sanitization removes everything
-    if not sanitized:
-        sanitized = "search_results"
-    
-    return sanitized
+# Precompiled patterns (compiled once instead of on every call)
+YOUTUBE_URL_RE = re.compile(r'youtube\.com|youtu\.be')  # youtube.com / youtu.be hosts
 
+# On-disk cache of search results, so repeated queries skip the Tor round-trip
+SEARCH_CACHE_DIR = Path.home() / ".cache" / "ghosttube" / "search"
+SEARCH_CACHE_TTL = 3600                             # Seconds before re-searching
 
-def print_header(text):
-    """
-    Print a formatted section header for better terminal output readability.
-    
-    Creates a visually distinct header with equal signs border to separate
-    different stages of the script execution.
-    
-    Args:
-        text (str): The header text to display
-        
-    Example output:
-        ============================================================
-          STEP 1: Checking Prerequisites
-        ============================================================
-    """
-    print(f"\n{'='*60}")
-    print(f"  {text}")
-    print(f"{'='*60}\n")
+# Download concurrency: number of yt-dlp downloads running in parallel
+MAX_WORKERS = env_int("GHOSTTUBE_WORKERS", 4)
+
+# Look up the exit IP of every URL's circuit (one extra Tor round-trip per URL)
+VERIFY_IP = os.environ.get("GHOSTTUBE_VERIFY_IP") == "1"
+
+# Local ffmpeg used to transcode downloaded audio (no proxy needed)
+FFMPEG_BIN = "ffmpeg"
+
+# ffmpeg encoder arguments per audio format (best quality, like yt-dlp's
+# --audio-quality 0). Formats not listed are left to ffmpeg's defaults.
+AUDIO_CODEC_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "0"],
+    "aac": ["-c:a", "aac", "-b:a", "256k"],
+    "m4a": ["-c:a", "aac", "-b:a", "256k"],
+    "flac": ["-c:a", "flac"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "10"],
+    "opus": ["-c:a", "libopus", "-b:a", "192k"],
+    "alac": ["-c:a", "alac"],
+    "vorbis": ["-c:a", "libvorbis", "-q:a", "10"],
+}
+
+# Container extension for codec names that have no muxer of their own
+# (ffmpeg picks the muxer from the output extension)
+AUDIO_FORMAT_EXT = {"alac": "m4a", "vorbis": "ogg"}
+
+# (source extension, target format) pairs whose audio stream can be copied
+COPY_COMPATIBLE = {("webm", "opus"), ("m4a", "aac")}
+
+# Lock shared by the download worker threads
+PRINT_LOCK = threading.Lock()   # Keep each worker's console output together
 
 
+# ============================================================================
+# UTILITY FUNCTIONS
+# ============================================================================
+
 def ensure_directories():
     """
     Create necessary directories if they don't exist.
@@ -133,22 +147,53 @@ def ensure_directories():
         - output/audio/       (audio downloads)
         - output/video/       (video downloads)
         - output/transcripts/ (transcript files)
+    
+    A marker file in the output directory records that setup already ran, so
+    later launches skip the mkdir calls. Per-query subdirectories are still
+    created with parents=True, so a removed folder is recreated on demand.
     """
+    if DIRS_MARKER.exists():
+        return
+    
     for directory in [VENV_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS]:
         directory.mkdir(parents=True, exist_ok=True)
+    
+    DIRS_MARKER.touch()
 
 
 # ============================================================================
 # TOR NETWORK FUNCTIONS
 # ============================================================================
 
-def get_current_ip():
+def isolated_proxy(name):
+    """
+    Build a Tor proxy URL whose traffic gets a circuit of its own.
+    
+    Tor's IsolateSOCKSAuth (on by default) keeps streams with different SOCKS
+    credentials on different circuits. Giving every URL unique credentials
+    therefore gives it its own exit without sending NEWNYM, which would
+    change the circuit under downloads still running in other workers.
+    
+    Args:
+        name: Anything unique within this run (e.g., the URL's index)
+        
+    Returns:
+        str: SOCKS5 proxy URL with per-run, per-name credentials
+    """
+    return f"socks5://{RUN_ID}-{name}:x@{TOR_SOCKS_ADDR}"
+
+
+def get_current_ip(proxy=None):
     """
     Fetch the current public IP address via Tor proxy.
     
     Makes a request to ident.me service through Tor to determine the current
     exit node's IP address. Useful for verifying Tor connectivity and 
-    confirming identity changes after rotation.
+    showing which exit an isolated circuit uses.
+    
+    Args:
+        proxy (str): Specific proxy (see isolated_proxy()); defaults to the
+            shared Tor proxy
     
     Returns:
         str: Current public IP address, or error message if request fails
@@ -158,44 +203,13 @@ def get_current_ip():
         '185.220.101.52'
     """
     try:
-        resp = requests.get('https://ident.me', proxies=PROXIES, timeout=10)
+        proxies = {'http': proxy, 'https': proxy} if proxy else None
+        resp = SESSION.get('https://ident.me', proxies=proxies, timeout=10)
         return resp.text.strip()
     except Exception as e:
         return f"Error: {e}"
 
 
-def renew_tor_identity():
-    """
-    Request a new Tor circuit to rotate the public IP address.
-    
-    Sends a NEWNYM signal to the Tor controller, which causes Tor to establish
-    a new circuit with a different exit node. This provides a fresh IP address
-    for enhanced privacy between downloads.
-    
-    Returns:
-        bool: True if identity rotation succeeded, False otherwise
-        
-    Note:
-        Waits 5 seconds after sending signal to allow new circuit to establish.
-        Requires Tor ControlPort to be accessible and authentication to succeed.
-    """
-    try:
-        # Connect to Tor control port and authenticate
-        with Controller.from_port(port=TOR_CONTROL_PORT) as ctrl:
-            ctrl.authenticate()
-            
-            # Request new identity (new circuit/exit node)
-            ctrl.signal(Signal.NEWNYM)
-        
-        # Wait for new circuit to establish before proceeding
-        time.sleep(5)
-        return True
-        
-    except Exception as e:
-        print(f"  [WARNING] Identity rotation failed: {e}")
-        return False
-
-
 def check_tor_connection():
     """
     Verify that Tor is running and accessible.
@@ -234,20 +248,18 @@ def check_prerequisites():
     This function performs a comprehensive check of the runtime environment:
         1. Python version verification (3.7+ required)
         2. Tor connectivity test
-        3. Virtual environment creation/verification
-        4. Required Python package installation
-        5. pip upgrade to latest version
-    
-    Returns:
-        str: Path to the Python binary in the virtual environment
+        3. Virtual environment creation/verification and activation
+        4. Required Python package installation (import check, pip only
+           for missing packages)
+        5. pip upgrade to latest version (at most once per day)
         
     Exits:
         Terminates script if Python version is too old or Tor is unavailable
         
     Packages installed/verified:
         - requests[socks]: HTTP library with SOCKS proxy support
-        - stem: Python library for Tor control
         - yt-dlp: YouTube download utility
+        - duckduckgo_search: DuckDuckGo search client
     """
     print_header("STEP 1: Checking Prerequisites")
     
@@ -265,81 +277,141 @@ def check_prerequisites():
         print("[ERROR] Cannot connect to Tor!")
         print("  Make sure Tor is running with:")
         print("    - SOCKS proxy on 127.0.0.1:9050")
-        print("    - ControlPort 9051")
-        print("    - CookieAuthentication 1")
         sys.exit(1)
         
     print(f"✓ Tor is running (IP: {tor_ip})")
     
     # ---- Virtual Environment Setup ----
-    # Check for venv existence (cross-platform: Unix uses bin/, Windows uses Scripts/)
-    venv_exists = (
-        (VENV_DIR / "bin" / "python").exists() or 
-        (VENV_DIR / "Scripts" / "python.exe").exists()
-    )
-    
-    if not venv_exists:
-        print("\n[INFO] Creating virtual environment...")
-        subprocess.check_call([sys.executable, "-m", "venv", str(VENV_DIR)])
-    else:
-        print("✓ Virtual environment exists")
+    # Rebuilt when another Python version made it: activate_venv() below can
+    # only find the site-packages of a venv created by this interpreter
+    create_venv()
     
-    # Determine correct paths for current OS
-    if os.name != "nt":  # Unix-like (Linux, macOS)
-        python_bin = VENV_DIR / "bin" / "python"
-        pip_bin = VENV_DIR / "bin" / "pip"
-    else:  # Windows
-        python_bin = VENV_DIR / "Scripts" / "python.exe"
-        pip_bin = VENV_DIR / "Scripts" / "pip.exe"
+    # ---- Virtual Environment Activation ----
+    # yt-dlp runs in-process, so the venv's packages must be importable here
+    activate_venv()
     
     # ---- Package Installation Check ----
-    # Format: (package_name_for_install, package_name_for_verification)
+    # Format: (package_name_for_install, module_name_for_import_check)
     required_packages = [
         ("requests[socks]", "requests"),  # HTTP with SOCKS support
-        ("stem", "stem"),                  # Tor controller
-        ("yt-dlp", "yt-dlp")              # YouTube downloader
+        ("yt-dlp", "yt_dlp"),             # YouTube downloader
+        ("duckduckgo_search", "duckduckgo_search")  # DuckDuckGo search API
     ]
     
-    for install_name, check_name in required_packages:
-        try:
-            # Check if package is already installed
-            subprocess.run(
-                [pip_bin, "show", check_name], 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL, 
-                check=True
-            )
-            print(f"✓ {check_name} installed")
-            
-        except subprocess.CalledProcessError:
-            # Package not found, install it
-            print(f"[INFO] Installing {install_name}...")
-            subprocess.check_call([pip_bin, "install", install_name])
+    # An import lookup is in-process and far cheaper than spawning pip
+    missing = []
+    for install_name, module_name in required_packages:
+        if importlib.util.find_spec(module_name) is not None:
+            print(f"✓ {install_name} installed")
+        else:
+            missing.append(install_name)
+    
+    # Install whatever is missing in one go (one dependency resolution)
+    if missing:
+        print(f"[INFO] Installing {', '.join(missing)}...")
+        subprocess.check_call([PIP_BIN, "install", *missing])
+        importlib.invalidate_caches()  # Make the new packages importable
     
     # ---- pip Update ----
-    print("\n[INFO] Ensuring pip is up-to-date...")
-    subprocess.run(
-        [pip_bin, "install", "--upgrade", "pip"], 
-        stdout=subprocess.DEVNULL, 
-        stderr=subprocess.DEVNULL
-    )
-    print("✓ pip is up-to-date")
+    # Upgrading pip is a network round-trip, so only try it once per day
+    if pip_upgrade_due():
+        print("\n[INFO] Ensuring pip is up-to-date...")
+        subprocess.run(
+            [PIP_BIN, "install", "--upgrade", "pip"], 
+            stdout=subprocess.DEVNULL, 
+            stderr=subprocess.DEVNULL
+        )
+        PIP_CHECK_MARKER.touch()
+        print("✓ pip is up-to-date")
+    else:
+        print("✓ pip checked recently, skipping upgrade")
     
     print("\n[✓] All prerequisites checked and ready!\n")
-    return str(python_bin)
+
+
+def pip_upgrade_due():
+    """
+    Check whether pip should be upgraded on this run.
+    
+    The time of the last upgrade attempt is the mtime of PIP_CHECK_MARKER
+    inside the venv, so warm runs skip the blocking pip subprocess.
+    
+    Returns:
+        bool: True if the last check is older than PIP_CHECK_INTERVAL
+    """
+    try:
+        return time.time() - PIP_CHECK_MARKER.stat().st_mtime >= PIP_CHECK_INTERVAL
+    except OSError:
+        return True
 
 
 # ============================================================================
 # SEARCH FUNCTIONS
 # ============================================================================
 
+def search_cache_path(query, max_results):
+    """
+    Return the cache file used for a (query, max_results) search.
+    
+    Args:
+        query (str): The search query string
+        max_results (int): Maximum number of YouTube URLs requested
+        
+    Returns:
+        Path: JSON file inside SEARCH_CACHE_DIR named by a SHA-256 of the key
+    """
+    key = hashlib.sha256(f"{query}|{max_results}".encode("utf-8")).hexdigest()
+    return SEARCH_CACHE_DIR / f"{key}.json"
+
+
+def load_cached_search(cache_file):
+    """
+    Load cached search results if they are younger than SEARCH_CACHE_TTL.
+    
+    Args:
+        cache_file (Path): Cache file from search_cache_path()
+        
+    Returns:
+        list: Cached URLs, or None on a cache miss (missing, stale, unreadable)
+    """
+    try:
+        if time.time() - cache_file.stat().st_mtime >= SEARCH_CACHE_TTL:
+            return None
+        with cache_file.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_cached_search(cache_file, urls):
+    """
+    Save search results to the cache.
+    
+    Writes to a temporary file first and renames it into place, so a reader
+    never sees a half-written cache entry. Cache failures are not fatal.
+    
+    Args:
+        cache_file (Path): Cache file from search_cache_path()
+        urls (list): YouTube URLs to cache
+    """
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            json.dump(urls, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"[WARNING] Could not cache search results: {e}")
+
+
 def search_youtube(query, max_results=10):
     """
     Search DuckDuckGo for YouTube content via Tor proxy.
     
-    Performs a web search on DuckDuckGo specifically targeting YouTube URLs.
-    All requests are routed through Tor for privacy. Handles URL extraction
-    and cleaning from DuckDuckGo's HTML response.
+    Uses the duckduckgo_search library, which talks to DuckDuckGo's
+    structured endpoints and returns direct result URLs. Compared to scraping
+    the HTML results page this transfers far fewer bytes over Tor and needs
+    no HTML parsing or redirect unwrapping.
     
     Args:
         query (str): The search query string
@@ -356,64 +428,46 @@ def search_youtube(query, max_results=10):
     Note:
         - Searches both youtube.com and music.youtube.com
         - Deduplicates results
-        - Handles DuckDuckGo's URL obfuscation (uddg parameter)
+        - Results are cached on disk for SEARCH_CACHE_TTL seconds
     """
-    # Construct DuckDuckGo search URL with site restriction
-    search_url = (
-        f"https://html.duckduckgo.com/html/"
-        f"?q={quote_plus(query)} site:youtube.com OR site:music.youtube.com"
-    )
+    # Serve repeated queries from the on-disk cache
+    cache_file = search_cache_path(query, max_results)
+    cached = load_cached_search(cache_file)
+    if cached is not None:
+        print("[INFO] Using cached search results")
+        return cached
     
-    # Use a common browser user agent to avoid being blocked
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    # Imported here: duckduckgo_search lives in the venv activated by
+    # check_prerequisites()
+    from duckduckgo_search import DDGS
+    
+    # Restrict the search to YouTube domains
+    search_terms = f"{query} site:youtube.com OR site:music.youtube.com"
     
     try:
         # Make search request through Tor proxy
-        response = requests.get(
-            search_url, 
-            headers=headers, 
-            proxies=PROXIES, 
-            timeout=30
-        )
-        response.raise_for_status()
-        
-        # Extract URLs from search result HTML
-        # Pattern matches DuckDuckGo's result link class
-        pattern = r'<a[^>]+class="result__a"[^>]+href="([^"]+)"'
-        raw_urls = re.findall(pattern, response.text)
+        with DDGS(proxy=TOR_PROXY, timeout=30) as ddgs:
+            hits = ddgs.text(search_terms, max_results=max_results) or []
         
         # Process and clean URLs
         clean_urls = []
         seen = set()  # Track URLs to prevent duplicates
         
-        for url in raw_urls:
-            # Handle protocol-relative URLs
-            if url.startswith("//"):
-                url = "https:" + url
+        for hit in hits:
+            url = hit.get("href", "")
             
-            # DuckDuckGo wraps URLs in a redirect - extract the actual URL
-            if "uddg=" in url:
-                parsed = urllib.parse.urlparse(url)
-                qs = urllib.parse.parse_qs(parsed.query)
-                
-                if "uddg" in qs:
-                    # Decode the actual YouTube URL from the uddg parameter
-                    url = urllib.parse.unquote(qs["uddg"][0])
-            
-            # Filter: only keep YouTube URLs
-            if not ("youtube.com" in url or "youtu.be" in url):
+            # Filter: only keep YouTube URLs (one scan for both hosts)
+            if not YOUTUBE_URL_RE.search(url):
                 continue
             
             # Add unique URLs only
             if url not in seen:
                 seen.add(url)
                 clean_urls.append(url)
-            
-            # Stop when we have enough results
-            if len(clean_urls) >= max_results:
-                break
+        
+        # Only cache real results; an empty page may be a temporary block
+        if clean_urls:
+            store_cached_search(cache_file, clean_urls)
         
         return clean_urls
         
@@ -422,31 +476,6 @@ def search_youtube(query, max_results=10):
         return []
 
 
-def save_urls_to_file(urls):
-    """
-    Save discovered YouTube URLs to urls.txt file.
-    
-    Overwrites the urls.txt file with the current search results. Each URL
-    is written on a separate line for easy reading and processing.
-    
-    Args:
-        urls (list): List of YouTube URLs to save
-        
-    Side effects:
-        - Creates or overwrites urls.txt in script directory
-        - Prints confirmation message with URL count
-        
-    Example:
-        >>> save_urls_to_file(['https://youtube.com/watch?v=abc', ...])
-        [✓] Saved 10 URLs to /path/to/urls.txt
-    """
-    with URLS_FILE.open("w", encoding="utf-8") as f:
-        for url in urls:
-            f.write(url + "\n")
-    
-    print(f"[✓] Saved {len(urls)} URLs to {URLS_FILE}")
-
-
 # ============================================================================
 # USER INPUT FUNCTIONS
 # ============================================================================
@@ -587,19 +616,102 @@ def get_download_options():
 # DOWNLOAD FUNCTIONS
 # ============================================================================
 
-def download_media(python_bin, url, audio, video, download_transcripts,
-                   audio_subdir, video_subdir, transcripts_subdir, audio_format="mp3"):
+def downloaded_files(info):
+    """
+    Collect the final file paths from a yt-dlp info dict.
+    
+    Works for single videos and playlists (whose entries each carry their own
+    requested_downloads list).
+    
+    Args:
+        info (dict): Info dict returned by YoutubeDL.extract_info()
+        
+    Returns:
+        list: Paths of the files yt-dlp wrote
+    """
+    entries = info.get("entries") or [info]
+    return [
+        Path(download["filepath"])
+        for entry in entries if entry
+        for download in entry.get("requested_downloads", [])
+    ]
+
+
+def output_template(media_dir, transcripts_subdir):
     """
-    Download audio, video, and/or transcripts from YouTube using yt-dlp.
+    Build yt-dlp output templates for a media folder.
+    
+    Media files go to media_dir; subtitles, when requested, go to the
+    transcripts folder even though they are written by the same yt-dlp run.
+    
+    Args:
+        media_dir (Path): Directory for the downloaded media
+        transcripts_subdir (Path): Directory for transcripts (or None)
+        
+    Returns:
+        dict: yt-dlp 'outtmpl' option
+    """
+    templates = {"default": str(media_dir / "%(title)s.%(ext)s")}
+    if transcripts_subdir:
+        templates["subtitle"] = str(transcripts_subdir / "%(title)s.%(ext)s")
+    return templates
+
+
+def extract_media(url, opts, subtitle_opts):
+    """
+    Run one yt-dlp download, treating its transcripts as best-effort.
+    
+    yt-dlp writes subtitles before the media and, unless ignoreerrors is
+    True, raises DownloadError when they fail (e.g. a timedtext 429), which
+    also skips the media. In that case the URL is downloaded again with the
+    media options alone, so a missing transcript never costs the media.
     
-    Constructs and executes yt-dlp commands based on user preferences. All
-    downloads are routed through Tor proxy for privacy. Handles three scenarios:
+    Args:
+        url (str): YouTube URL to download
+        opts (dict): yt-dlp options for the media
+        subtitle_opts (dict): Extra options for the transcripts (or empty)
+        
+    Returns:
+        dict: yt-dlp info dict of the download
+        
+    Raises:
+        yt_dlp.utils.DownloadError: If the media download fails
+    """
+    # Imported here: yt-dlp lives in the venv activated by check_prerequisites()
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError
+    
+    try:
+        with YoutubeDL({**opts, **subtitle_opts}) as ydl:
+            return ydl.extract_info(url, download=True)
+    except DownloadError as e:
+        if not subtitle_opts or not is_subtitle_error(e):
+            raise
+    
+    with PRINT_LOCK:
+        print(f"  [WARNING] No transcript for {url}, downloading media only")
+    with YoutubeDL(opts) as ydl:
+        return ydl.extract_info(url, download=True)
+
+
+def fetch_raw(url, audio, video, download_transcripts,
+              audio_subdir, video_subdir, transcripts_subdir, proxy=TOR_PROXY):
+    """
+    Download the raw media for a URL with yt-dlp, without transcoding audio.
+    
+    This is the network-bound stage of the download pipeline. yt-dlp is used
+    in-process through its YoutubeDL API, so no interpreter is spawned per
+    download. Audio is fetched as the best available audio stream in its
+    native container; conversion to the requested format is left to
+    postprocess() so that the next URL can start downloading while this one
+    is being transcoded. All downloads are routed through Tor proxy for
+    privacy. Handles three scenarios:
         1. Audio only
         2. Video only
-        3. Both audio and video (downloaded separately)
+        3. Both audio and video (one download; the audio track is extracted
+           from the merged video instead of being fetched again through Tor)
         
     Args:
-        python_bin (str): Path to Python binary in virtual environment
         url (str): YouTube URL to download
         audio (bool): Whether to download audio
         video (bool): Whether to download video
@@ -607,83 +719,260 @@ def download_media(python_bin, url, audio, video, download_transcripts,
         audio_subdir (Path): Directory for audio files (or None)
         video_subdir (Path): Directory for video files (or None)
         transcripts_subdir (Path): Directory for transcripts (or None)
-        audio_format (str): Audio format code (default: 'mp3')
+        proxy (str): Tor proxy URL for this download (see isolated_proxy())
+        
+    Returns:
+        list: (path, keep_source) tuples for post-processing. keep_source is
+              True when the path is the merged video, which must survive
+              audio extraction
         
     Raises:
-        subprocess.CalledProcessError: If yt-dlp command fails
+        yt_dlp.utils.DownloadError: If yt-dlp fails
         
     Note:
-        - Audio quality is set to 0 (best available)
-        - Video format is bestvideo+bestaudio merged to MP4
-        - Transcripts are auto-generated English subtitles converted to TXT
+        - Video format is bestvideo+bestaudio merged to MP4 (a stream copy,
+          so it stays in this stage)
+        - Transcripts are auto-generated English subtitles converted to SRT,
+          written by the same yt-dlp run as the media (best-effort, see
+          extract_media())
         - All network traffic routes through Tor proxy
+        - yt-dlp runs quietly (warnings and errors only) so parallel workers
+          don't interleave their progress bars on the console
     """
-    # Base arguments for all yt-dlp commands (Tor proxy)
-    tor_args = ["--proxy", TOR_PROXY]
-
-    # ---- Scenario 1: Both Audio and Video ----
-    if audio and video:
-        # Download audio separately with format conversion
-        cmd_audio = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-x",                           # Extract audio
-            "--audio-format", audio_format, # Convert to specified format
-            "--audio-quality", "0",         # Best quality
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),  # Output template
-            url
-        ]
-        subprocess.run(cmd_audio, check=True)
-
-        # Download video separately
-        cmd_video = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-f", "bestvideo+bestaudio",    # Best quality video + audio
-            "--merge-output-format", "mp4", # Merge to MP4 container
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_video, check=True)
-
-    # ---- Scenario 2: Audio Only ----
-    elif audio:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-x",                           # Extract audio
-            "--audio-format", audio_format,
-            "--audio-quality", "0",
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
-
-    # ---- Scenario 3: Video Only ----
-    elif video:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-f", "bestvideo+bestaudio",
-            "--merge-output-format", "mp4",
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
-
-    # ---- Optional: Download Transcripts ----
+    # Imported here: yt-dlp lives in the venv activated by check_prerequisites()
+    from yt_dlp import YoutubeDL
+
+    # Base options for all yt-dlp runs (Tor proxy, quiet output)
+    base_opts = {
+        "proxy": proxy,
+        "quiet": True,
+        "noprogress": True,
+    }
+    
+    # ---- Optional: Transcripts, written by the same run as the media ----
+    # Saves a second info extraction (another Tor round-trip) per URL
+    subtitle_opts = {}
     if download_transcripts:
-        cmd_transcript = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "--skip-download",      # Don't download media
-            "--write-auto-sub",     # Get auto-generated subtitles
-            "--sub-lang", "en",     # English subtitles
-            "--convert-subs", "txt",# Convert to plain text
-            "-o", str(transcripts_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_transcript, check=True)
+        subtitle_opts = {
+            "writeautomaticsub": True,      # Get auto-generated subtitles
+            "subtitleslangs": ["en"],       # English subtitles
+            "postprocessors": [{            # Convert to SubRip
+                "key": "FFmpegSubtitlesConvertor",
+                "format": "srt",
+                "when": "before_dl",
+            }],
+        }
+    
+    audio_jobs = []
+
+    # ---- Video: best video + audio merged into MP4 ----
+    if video:
+        video_opts = {
+            **base_opts,
+            "format": "bestvideo+bestaudio",    # Best quality video + audio
+            "merge_output_format": "mp4",       # Merge to MP4 container
+            "outtmpl": output_template(video_subdir, transcripts_subdir),
+        }
+        info = extract_media(url, video_opts, subtitle_opts)
+        
+        # Both selected: reuse the audio track already downloaded with the video
+        if audio:
+            audio_jobs.extend((path, True) for path in downloaded_files(info))
+
+    # ---- Audio only: fetch the native stream, transcoding happens later ----
+    elif audio:
+        audio_opts = {
+            **base_opts,
+            "format": "bestaudio/best",     # Best audio stream as-is
+            "outtmpl": output_template(audio_subdir, transcripts_subdir),
+        }
+        info = extract_media(url, audio_opts, subtitle_opts)
+        audio_jobs.extend((path, False) for path in downloaded_files(info))
+
+    # ---- Transcripts only (no media selected) ----
+    elif download_transcripts:
+        transcript_opts = {
+            **base_opts,
+            **subtitle_opts,
+            "skip_download": True,          # Don't download media
+            "outtmpl": output_template(transcripts_subdir, transcripts_subdir),
+        }
+        with YoutubeDL(transcript_opts) as ydl:
+            ydl.download([url])
+
+    return audio_jobs
+
+
+# ============================================================================
+# POST-PROCESSING FUNCTIONS
+# ============================================================================
+
+def postprocess(path, audio_format, output_dir, keep_source=False):
+    """
+    Convert a downloaded file's audio to the requested format with ffmpeg.
+    
+    This is the CPU-bound stage of the download pipeline. It runs locally, so
+    no Tor proxy is involved. Streams that are already in the requested codec
+    are copied instead of re-encoded, and raw audio that already has the
+    target extension is left untouched.
+    
+    Args:
+        path (Path): Raw audio file or merged video produced by fetch_raw()
+        audio_format (str): Audio format code (e.g., 'mp3', 'flac')
+        output_dir (Path): Directory for the converted audio file
+        keep_source (bool): Keep the source file (used for merged videos)
+        
+    Returns:
+        Path: The converted audio file
+        
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+        
+    Note:
+        Unless keep_source is set, the raw file is deleted once conversion
+        succeeds (or replaced, when it already has the target extension).
+    """
+    source_ext = path.suffix.lstrip(".").lower()
+    target_ext = AUDIO_FORMAT_EXT.get(audio_format, audio_format)
+    if source_ext == audio_format and not keep_source:
+        return path
+    
+    target = output_dir / f"{path.stem}.{target_ext}"
+    # e.g. ALAC from an .m4a source: ffmpeg can't read and write one file, so
+    # encode next to it and swap it in afterwards (keeping the extension last
+    # so ffmpeg still picks the right muxer)
+    in_place = target == path
+    output = path.with_name(f"{path.stem}.converting.{target_ext}") if in_place else target
+    
+    if (source_ext, audio_format) in COPY_COMPATIBLE:
+        codec_args = ["-c:a", "copy"]
+    else:
+        # Other custom formats let ffmpeg pick the encoder from the extension
+        codec_args = AUDIO_CODEC_ARGS.get(audio_format, [])
+    
+    cmd = [
+        FFMPEG_BIN,
+        "-nostdin", "-loglevel", "error",
+        "-y",                       # Overwrite previous conversions
+        "-i", str(path),
+        "-vn",                      # Drop any embedded artwork/video
+        *codec_args,
+        str(output)
+    ]
+    subprocess.run(cmd, check=True)
+    
+    if in_place:
+        os.replace(output, target)  # The source is replaced, not deleted
+    elif not keep_source:
+        path.unlink()
+    return target
+
+
+def postprocess_worker(pp_queue):
+    """
+    Consume downloaded files from the queue and convert them one at a time.
+    
+    Runs in its own thread alongside the download pool so transcoding overlaps
+    with network transfers. Stops when it receives None.
+    
+    Args:
+        pp_queue (queue.Queue): Queue of
+            (idx, total, path, keep_source, audio_format, output_dir) jobs
+    """
+    while True:
+        job = pp_queue.get()
+        if job is None:
+            break
+        
+        idx, total, path, keep_source, audio_format, output_dir = job
+        try:
+            target = postprocess(path, audio_format, output_dir, keep_source)
+            with PRINT_LOCK:
+                print(f"[✓] [{idx}/{total}] Converted: {target.name}")
+        except subprocess.CalledProcessError as e:
+            with PRINT_LOCK:
+                print(f"[ERROR] [{idx}/{total}] Conversion failed: {e}")
+        except Exception as e:
+            with PRINT_LOCK:
+                print(f"[ERROR] [{idx}/{total}] Unexpected conversion error: {e}")
+
+
+def process_url(idx, total, url, audio, video, download_transcripts,
+                audio_subdir, video_subdir, transcripts_subdir, audio_format, pp_queue):
+    """
+    Download a single URL on its own Tor circuit (thread pool worker).
+    
+    Each URL gets unique SOCKS credentials (isolated_proxy()), so Tor builds
+    it a separate circuit; no NEWNYM is sent, which would also swap the exit
+    of downloads still running in the other workers (this supersedes the
+    NEWNYM rotation and its cooldown/settle handling). A download that fails
+    with a suspected blocked exit (exit_suspect()) is retried once on another
+    fresh circuit, as in ghosttube.py. Console output is grouped under
+    PRINT_LOCK so each URL's messages stay readable. Downloaded files that
+    need audio conversion are handed to the post-processing thread through
+    pp_queue.
+    
+    Args:
+        idx (int): 1-based position of the URL in the result list
+        total (int): Total number of URLs being processed
+        url (str): YouTube URL to download
+        audio_format (str): Audio format code
+        pp_queue (queue.Queue): Post-processing queue for audio conversion
+        (remaining arguments are passed straight through to fetch_raw)
+        
+    Returns:
+        bool: True if the download succeeded, False otherwise
+    """
+    from yt_dlp.utils import DownloadError
+    
+    # ---- Isolated Tor circuit for this URL ----
+    # The exit IP lookup is an extra Tor round-trip, so it only runs when
+    # GHOSTTUBE_VERIFY_IP=1
+    proxy = isolated_proxy(idx)
+    exit_ip = get_current_ip(proxy) if VERIFY_IP else None
+    
+    with PRINT_LOCK:
+        print(f"\n--- [{idx}/{total}] ---")
+        print("🔄 Using an isolated Tor circuit...")
+        if VERIFY_IP:
+            print(f"  Exit IP: {exit_ip}")
+        print(f"\n📥 Downloading: {url}")
+    
+    # ---- Download the content ----
+    try:
+        try:
+            audio_jobs = fetch_raw(
+                url, audio, video, download_transcripts,
+                audio_subdir, video_subdir, transcripts_subdir, proxy
+            )
+        except DownloadError as e:
+            # Private/removed videos fail on any exit; only a suspected bad
+            # exit is worth one retry, on new credentials (a new circuit)
+            if not exit_suspect(e):
+                raise
+            with PRINT_LOCK:
+                print(f"  [WARNING] [{idx}/{total}] Retrying on a new circuit: {url}")
+            audio_jobs = fetch_raw(
+                url, audio, video, download_transcripts,
+                audio_subdir, video_subdir, transcripts_subdir,
+                isolated_proxy(f"{idx}-retry")
+            )
+    except DownloadError as e:
+        with PRINT_LOCK:
+            print(f"[ERROR] [{idx}/{total}] Download failed: {e}")
+        return False
+    except Exception as e:
+        with PRINT_LOCK:
+            print(f"[ERROR] [{idx}/{total}] Unexpected error: {e}")
+        return False
+    
+    with PRINT_LOCK:
+        print(f"[✓] [{idx}/{total}] Download completed: {url}")
+    
+    # Queue transcoding so this worker can move on to the next URL
+    for path, keep_source in audio_jobs:
+        pp_queue.put((idx, total, path, keep_source, audio_format, audio_subdir))
+    return True
 
 
 # ============================================================================
@@ -699,7 +988,7 @@ def main():
         2. Search: Get user query and search DuckDuckGo via Tor
         3. Save: Store URLs to urls.txt
         4. Configure: Get user preferences for downloads
-        5. Download: Process each URL with Tor identity rotation
+        5. Download: Process each URL on its own Tor circuit
         6. Complete: Display summary of downloaded content
         
     The function handles user interaction, error reporting, and coordinates
@@ -709,7 +998,7 @@ def main():
     
     # ---- Step 1: Setup ----
     ensure_directories()
-    python_bin = check_prerequisites()
+    check_prerequisites()
     
     # ---- Step 2: Search ----
     print_header("STEP 2: Search YouTube Content")
@@ -741,7 +1030,7 @@ def main():
     save_urls_to_file(results)
     
     # ---- Step 4: Configure Downloads ----
-    print_header("STEP 4: Download Media with Identity Rotation")
+    print_header("STEP 4: Download Media over Isolated Tor Circuits")
     audio, video, download_transcripts, audio_format = get_download_options()
     
     # Create subdirectories only for selected options
@@ -757,41 +1046,39 @@ def main():
     if TRANSCRIPTS_SUBDIR:
         TRANSCRIPTS_SUBDIR.mkdir(parents=True, exist_ok=True)
     
-    # ---- Step 5: Download with Identity Rotation ----
-    print(f"\n[INFO] Starting downloads for {len(results)} URLs...")
-    print("[INFO] Rotating Tor identity before each download...\n")
+    # ---- Step 5: Download over Isolated Circuits ----
+    total = len(results)
+    print(f"\n[INFO] Starting downloads for {total} URLs ({MAX_WORKERS} in parallel)...")
+    print("[INFO] Giving each download its own Tor circuit...\n")
     
-    for idx, url in enumerate(results, 1):
-        print(f"\n--- [{idx}/{len(results)}] ---")
-        
-        # Rotate Tor identity for privacy
-        print("🔄 Rotating Tor identity...")
-        old_ip = get_current_ip()
-        
-        if renew_tor_identity():
-            new_ip = get_current_ip()
-            print(f"  Old IP: {old_ip}")
-            print(f"  New IP: {new_ip}")
-            print(f"  ✓ Identity changed: {new_ip != old_ip}")
-        else:
-            print("  [WARNING] Proceeding with current identity")
-        
-        # Download the content
-        print(f"\n📥 Downloading: {url}")
-        try:
-            download_media(
-                python_bin, url, audio, video, download_transcripts,
-                AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR, audio_format
-            )
-            print(f"[✓] Download completed!")
-            
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] Download failed: {e}")
-        except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+    # Audio transcoding runs on its own thread, fed by the download workers
+    pp_queue = queue.Queue()
+    pp_thread = threading.Thread(target=postprocess_worker, args=(pp_queue,))
+    pp_thread.start()
+    
+    # Downloads are I/O-bound, so threads are enough to keep several yt-dlp
+    # downloads busy at once
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(
+                    process_url, idx, total, url,
+                    audio, video, download_transcripts,
+                    AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR, audio_format,
+                    pp_queue
+                )
+                for idx, url in enumerate(results, 1)
+            ]
+            succeeded = sum(future.result() for future in as_completed(futures))
+    finally:
+        # Let the post-processor drain the remaining conversions; the thread
+        # is non-daemon, so it must be stopped even if the downloads fail
+        pp_queue.put(None)
+        pp_thread.join()
     
     # ---- Step 6: Completion Summary ----
     print_header("COMPLETE!")
+    print(f"Downloaded {succeeded}/{total} URLs successfully")
     print(f"URLs saved to: {URLS_FILE}")
     print(f"Media saved to:")
     
@@ -803,7 +1090,7 @@ def main():
     if download_transcripts:
         print(f"  - Transcripts: {TRANSCRIPTS_SUBDIR}")
     
-    print("\nAll downloads completed with Tor identity rotation!")
+    print("\nAll downloads completed over isolated Tor circuits!")
     print("\n")
 
 
@@ -1,82 +1,166 @@
 #!/usr/bin/env python3
 """
 YouTube Collector Agent with Tor Integration
-Combines DuckDuckGo search + yt-dlp download with Tor identity rotation.
+Combines DuckDuckGo search + yt-dlp download with Tor circuit isolation.
 1. Checks prerequisites (including Tor)
 2. Searches DuckDuckGo for YouTube content (via Tor)
 3. Saves results to urls.txt (overwrites each run)
-4. Downloads media with identity rotation before each download
+4. Downloads media in batches, each on its own isolated Tor circuit
+
+Environment settings (all optional):
+  GHOSTTUBE_WORKERS=N        batches downloading in parallel (default 2)
+  GHOSTTUBE_BATCH_SIZE=N     URLs per batch, i.e. per Tor circuit (default 5)
+  GHOSTTUBE_TOR_INSTANCES=N  private Tor instances to spread batches over (default 0 = system Tor only)
+  GHOSTTUBE_VERIFY_IP=1      log each batch's exit IP (one extra Tor round-trip per batch)
+  GHOSTTUBE_QUIET=1          silence ffmpeg output
+  GHOSTTUBE_NO_CACHE=1       always search again instead of using results cached for 6 hours
+  GHOSTTUBE_UPGRADE_PIP=1    upgrade pip in the venv now instead of weekly
 """
 
 import os
 import sys
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import re
-import urllib.parse
+import copy
+import importlib
 import time
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import quote_plus
-from stem import Signal
-from stem.control import Controller
+from ripper_core import (
+    VENV_DIR, PIP_BIN, SCRIPT_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO,
+    OUTPUT_TRANSCRIPTS, URLS_FILE, OUTPUT_TEMPLATE, env_int, sanitize_query_for_dir,
+    print_header, ensure_directories, create_venv, activate_venv, iter_result_links,
+    unwrap_result_url, save_urls_to_file, get_download_options, exit_suspect,
+)
 
 # --- Tor Configuration ---
-TOR_PROXY = 'socks5://127.0.0.1:9050'
-TOR_CONTROL_PORT = 9051
+TOR_SOCKS_ADDR = '127.0.0.1:9050'
+TOR_PROXY = f'socks5://{TOR_SOCKS_ADDR}'
 PROXIES = {'http': TOR_PROXY, 'https': TOR_PROXY}
-
-# --- Working directories ---
-SCRIPT_DIR = Path.cwd()
-VENV_DIR = SCRIPT_DIR / ".venv"
-OUTPUT_DIR = SCRIPT_DIR / "output"
-OUTPUT_AUDIO = OUTPUT_DIR / "audio"
-OUTPUT_VIDEO = OUTPUT_DIR / "video"
-OUTPUT_TRANSCRIPTS = OUTPUT_DIR / "transcripts"
-URLS_FILE = SCRIPT_DIR / "urls.txt"
-
-
-def sanitize_query_for_dir(query):
-    """Sanitize search query to create a valid directory name."""
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', query).replace(' ', '_').strip()
-    if not sanitized:
-        sanitized = "search_results"
-    return sanitized
-
-
-def print_header(text):
-    print(f"\n{'='*60}")
-    print(f"  {text}")
-    print(f"{'='*60}\n")
+RUN_ID = secrets.token_hex(4)  # Keeps SOCKS credentials (and circuits) unique per run
+
+# Pooled session: reuses the SOCKS/TLS connection instead of a new handshake over Tor per call
+SESSION = requests.Session()
+SESSION.proxies.update(PROXIES)
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# --- pip self-upgrade ---
+UPGRADE_PIP = os.environ.get("GHOSTTUBE_UPGRADE_PIP", "") == "1"  # Force the pip self-upgrade
+PIP_UPGRADE_MARKER = VENV_DIR / ".pip_upgraded"
+PIP_UPGRADE_INTERVAL = 7 * 86400  # Seconds between automatic pip self-upgrades
+
+# --- Search cache ---
+SEARCH_CACHE_DIR = SCRIPT_DIR / ".cache"
+SEARCH_CACHE_TTL = 6 * 3600  # Seconds before a cached query is fetched again
+USE_SEARCH_CACHE = os.environ.get("GHOSTTUBE_NO_CACHE", "") != "1"
+
+# --- Download concurrency ---
+# Kept low by default: many parallel downloads through Tor look bot-like
+MAX_WORKERS = env_int("GHOSTTUBE_WORKERS", 2)
+BATCH_SIZE = env_int("GHOSTTUBE_BATCH_SIZE", 5)  # URLs per Tor circuit
+PRINT_LOCK = threading.Lock()  # Keep each worker's output together
+VERIFY_IP = os.environ.get("GHOSTTUBE_VERIFY_IP", "") == "1"  # Log each batch's exit IP (same switch as v2)
+QUIET = os.environ.get("GHOSTTUBE_QUIET", "") == "1"  # Silence ffmpeg output
+
+# --- Optional private Tor pool (downloads only; search still uses the system Tor) ---
+TOR_POOL_SIZE = env_int("GHOSTTUBE_TOR_INSTANCES", 0, minimum=0)  # 0 = system Tor only
+TOR_POOL_BASE_PORT = 9060  # Instance i: SocksPort 9060+i
+TOR_POOL_DIR = SCRIPT_DIR / ".tor-pool"  # One DataDirectory per instance
+FAULTY_PROXY_TTL = 4 * 3600  # Seconds an instance is skipped after failed downloads
+TOR_POOL = []        # SOCKS address of each running instance
+FAULTY_PROXIES = {}  # socks address -> time it was marked faulty
+
+# --- Precompiled patterns ---
+_ID_RE = re.compile(r'(?:v=|youtu\.be/|shorts/)([A-Za-z0-9_-]{11})')  # YouTube video ID
+
+# --- yt-dlp option templates (built once; main() only adds output folders) ---
+YDL_BASE_OPTS = {
+    "proxy": TOR_PROXY, "quiet": True, "noprogress": True,
+    # Parallel fragment GETs for DASH/HLS; kept at 2 so Tor traffic stays unremarkable
+    "concurrent_fragment_downloads": 2,
+    "http_chunk_size": 10 * 1024 * 1024,
+}
+YDL_AUDIO_OPTS = {
+    **YDL_BASE_OPTS,
+    "format": "bestaudio/best",
+    "postprocessors": [{"key": "FFmpegExtractAudio",
+                        "preferredcodec": "mp3", "preferredquality": "0"}],
+}
+YDL_VIDEO_OPTS = {
+    **YDL_BASE_OPTS,
+    "format": "bestvideo+bestaudio",
+    "merge_output_format": "mp4",
+}
+YDL_TRANSCRIPT_OPTS = {
+    **YDL_BASE_OPTS,
+    "skip_download": True,
+    "writeautomaticsub": True,
+    "subtitleslangs": ["en"],
+    # yt-dlp can only convert subtitles to srt/vtt/ass/lrc
+    "postprocessors": [{"key": "FFmpegSubtitlesConvertor",
+                        "format": "srt", "when": "before_dl"}],
+}
+
+
+def isolated_proxy(name, socks_addr=TOR_SOCKS_ADDR):
+    """Tor proxy with unique SOCKS credentials; IsolateSOCKSAuth gives it its own circuit."""
+    return f"socks5://{RUN_ID}-{name}:x@{socks_addr}"
+
+
+def start_tor_pool(n):
+    """Launch n private Tor instances in parallel; returns their processes."""
+    import stem.process
+
+    def launch(i):
+        socks_port = TOR_POOL_BASE_PORT + i
+        proc = stem.process.launch_tor_with_config(config={
+            "SocksPort": str(socks_port),
+            "DataDirectory": str(TOR_POOL_DIR / f"tor-{i}"),
+        }, take_ownership=True)  # Instances die with this script
+        return proc, f"127.0.0.1:{socks_port}"
+
+    print(f"[INFO] Starting {n} private Tor instances (ports {TOR_POOL_BASE_PORT}+)...")
+    TOR_POOL_DIR.mkdir(parents=True, exist_ok=True)
+    procs = []
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        for future in [executor.submit(launch, i) for i in range(n)]:
+            try:
+                proc, instance = future.result()
+            except OSError as e:
+                print(f"  [WARNING] Tor instance failed to start: {e}")
+                continue
+            procs.append(proc)
+            TOR_POOL.append(instance)
+    print(f"✓ {len(TOR_POOL)}/{n} Tor instances running")
+    return procs
 
 
-def ensure_directories():
-    """Create output and venv directories if they don't exist."""
-    for directory in [VENV_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS]:
-        directory.mkdir(parents=True, exist_ok=True)
+def get_proxy(i):
+    """SOCKS address for batch i, round-robin over healthy pool instances."""
+    now = time.time()
+    healthy = [addr for addr in TOR_POOL
+               if now - FAULTY_PROXIES.get(addr, float("-inf")) > FAULTY_PROXY_TTL]
+    if not healthy:
+        return TOR_SOCKS_ADDR
+    return healthy[i % len(healthy)]
 
 
-def get_current_ip():
-    """Fetch current IP via Tor."""
+def get_current_ip(proxy=None):
+    """Fetch current IP via Tor (optionally through a specific isolated proxy)."""
+    proxies = {'http': proxy, 'https': proxy} if proxy else None
     try:
-        resp = requests.get('https://ident.me', proxies=PROXIES, timeout=10)
+        resp = SESSION.get('https://ident.me', proxies=proxies, timeout=10)
         return resp.text.strip()
     except Exception as e:
         return f"Error: {e}"
 
 
-def renew_tor_identity():
-    """Rotate Tor circuit for a new identity."""
-    try:
-        with Controller.from_port(port=TOR_CONTROL_PORT) as ctrl:
-            ctrl.authenticate()
-            ctrl.signal(Signal.NEWNYM)
-        time.sleep(5)  # Wait for new circuit to establish
-        return True
-    except Exception as e:
-        print(f"  [WARNING] Identity rotation failed: {e}")
-        return False
-
-
 def check_tor_connection():
     """Verify Tor is running and accessible."""
     try:
@@ -92,88 +176,90 @@ def check_prerequisites():
     """Check and install all prerequisites including Tor."""
     print_header("STEP 1: Checking Prerequisites")
     
-    if sys.version_info < (3, 7):
-        print("[ERROR] Python 3.7+ required")
+    if sys.version_info < (3, 8):  # importlib.metadata
+        print("[ERROR] Python 3.8+ required")
         sys.exit(1)
     print(f"✓ Python {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}")
     
-    # Check Tor connection
+    # The Tor round-trip runs in the background while the venv and packages are checked
     print("\n[INFO] Checking Tor connection...")
-    tor_ok, tor_ip = check_tor_connection()
-    if not tor_ok:
-        print("[ERROR] Cannot connect to Tor!")
-        print("  Make sure Tor is running with:")
-        print("    - SOCKS proxy on 127.0.0.1:9050")
-        print("    - ControlPort 9051")
-        print("    - CookieAuthentication 1")
-        sys.exit(1)
-    print(f"✓ Tor is running (IP: {tor_ip})")
+    tor_check = ThreadPoolExecutor(max_workers=1)
+    tor_future = tor_check.submit(check_tor_connection)
     
-    if not (VENV_DIR / "bin" / "python").exists() and not (VENV_DIR / "Scripts" / "python.exe").exists():
-        print("\n[INFO] Creating virtual environment...")
-        subprocess.check_call([sys.executable, "-m", "venv", str(VENV_DIR)])
-    else:
-        print("✓ Virtual environment exists")
+    create_venv()
     
-    python_bin = VENV_DIR / "bin" / "python" if os.name != "nt" else VENV_DIR / "Scripts" / "python.exe"
-    pip_bin = VENV_DIR / "bin" / "pip" if os.name != "nt" else VENV_DIR / "Scripts" / "pip.exe"
+    # yt-dlp runs in-process, so the venv's packages must be importable here;
+    # this also lets importlib.metadata see them without spawning pip
+    activate_venv()
     
-    # Check/install required packages
+    # Check required packages in-process, then install whatever is missing at once
     required_packages = [
         ("requests[socks]", "requests"),
         ("stem", "stem"),
-        ("yt-dlp", "yt-dlp")
+        ("yt-dlp", "yt-dlp"),
+        ("diskcache", "diskcache")
     ]
     
+    from importlib.metadata import version, PackageNotFoundError  # 3.8+, checked above
+    missing = []
     for install_name, check_name in required_packages:
         try:
-            subprocess.run([pip_bin, "show", check_name], 
-                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-            print(f"✓ {check_name} installed")
-        except subprocess.CalledProcessError:
-            print(f"[INFO] Installing {install_name}...")
-            subprocess.check_call([pip_bin, "install", install_name])
+            print(f"✓ {check_name} {version(check_name)} installed")
+        except PackageNotFoundError:
+            missing.append(install_name)
+    if missing:
+        print(f"[INFO] Installing {', '.join(missing)}...")
+        subprocess.check_call([PIP_BIN, "install", *missing])
+        importlib.invalidate_caches()
+    
+    if pip_upgrade_due():
+        print("\n[INFO] Ensuring pip is up-to-date...")
+        subprocess.run([PIP_BIN, "install", "--upgrade", "pip"], 
+                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        PIP_UPGRADE_MARKER.touch()
+        print("✓ pip is up-to-date")
     
-    print("\n[INFO] Ensuring pip is up-to-date...")
-    subprocess.run([pip_bin, "install", "--upgrade", "pip"], 
-                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    print("✓ pip is up-to-date")
+    tor_ok, tor_ip = tor_future.result()
+    tor_check.shutdown()
+    if not tor_ok:
+        print("[ERROR] Cannot connect to Tor!")
+        print("  Make sure Tor is running with:")
+        print("    - SOCKS proxy on 127.0.0.1:9050")
+        sys.exit(1)
+    print(f"✓ Tor is running (IP: {tor_ip})")
     
     print("\n[✓] All prerequisites checked and ready!\n")
-    return str(python_bin)
+
+
+def pip_upgrade_due():
+    """True if forced or the last pip self-upgrade is older than PIP_UPGRADE_INTERVAL."""
+    if UPGRADE_PIP or not PIP_UPGRADE_MARKER.exists():
+        return True
+    return time.time() - PIP_UPGRADE_MARKER.stat().st_mtime > PIP_UPGRADE_INTERVAL
 
 
 def search_youtube(query, max_results=10):
     """Search DuckDuckGo for YouTube results via Tor."""
     url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)} site:youtube.com OR site:music.youtube.com"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
     
     try:
-        response = requests.get(url, headers=headers, proxies=PROXIES, timeout=30)
-        response.raise_for_status()
-        
-        pattern = r'<a[^>]+class="result__a"[^>]+href="([^"]+)"'
-        raw_urls = re.findall(pattern, response.text)
-        
-        clean_urls, seen = [], set()
-        for u in raw_urls:
-            if u.startswith("//"):
-                u = "https:" + u
-            if "uddg=" in u:
-                parsed = urllib.parse.urlparse(u)
-                qs = urllib.parse.parse_qs(parsed.query)
-                if "uddg" in qs:
-                    u = urllib.parse.unquote(qs["uddg"][0])
+        # Streamed so parsing starts as bytes arrive; leaving the block early
+        # closes the connection instead of pulling the rest of the page over Tor
+        with SESSION.get(url, timeout=30, stream=True) as response:
+            response.raise_for_status()
             
-            if not ("youtube.com" in u or "youtu.be" in u):
-                continue
-            if u not in seen:
-                seen.add(u)
-                clean_urls.append(u)
-            if len(clean_urls) >= max_results:
-                break
+            clean_urls, seen = [], set()
+            for u in map(unwrap_result_url, iter_result_links(response)):
+                if not ("youtube.com" in u or "youtu.be" in u):
+                    continue
+                # Same video under watch?v=, youtu.be/, shorts/ or music. is one entry
+                m = _ID_RE.search(u)
+                key = m.group(1) if m else u
+                if key not in seen:
+                    seen.add(key)
+                    clean_urls.append(u)
+                if len(clean_urls) >= max_results:
+                    break
         
         return clean_urls
     except Exception as e:
@@ -181,107 +267,140 @@ def search_youtube(query, max_results=10):
         return []
 
 
-def save_urls_to_file(urls):
-    """Overwrite urls.txt with current run results."""
-    with URLS_FILE.open("w", encoding="utf-8") as f:
-        for url in urls:
-            f.write(url + "\n")
-    print(f"[✓] Saved {len(urls)} URLs to {URLS_FILE}")
-
-
-def get_download_options():
-    """Ask user for download preferences."""
-    print("\nDownload options:")
-    print("1 - Audio only (MP3)")
-    print("2 - Video only (MP4)")
-    print("3 - Both audio and video")
-    choice = input("Choose 1, 2 or 3: ").strip()
-    
-    if choice == "1":
-        audio, video = True, False
-    elif choice == "2":
-        audio, video = False, True
-    elif choice == "3":
-        audio, video = True, True
-    else:
-        print("[ERROR] Invalid choice. Defaulting to audio only.")
-        audio, video = True, False
-    
-    transcripts_choice = input("Download transcripts if available? (y/n): ").strip().lower()
-    download_transcripts = transcripts_choice == "y"
-    
-    return audio, video, download_transcripts
-
-
-def download_media(python_bin, url, audio, video, download_transcripts,
+def cached_search_youtube(query, max_results=10):
+    """search_youtube() with results cached on disk for SEARCH_CACHE_TTL seconds."""
+    if not USE_SEARCH_CACHE:
+        return search_youtube(query, max_results)
+    from diskcache import Cache  # Lives in the venv activated by check_prerequisites()
+    key = (query, max_results)
+    with Cache(str(SEARCH_CACHE_DIR)) as cache:
+        results = cache.get(key)
+        if results is not None:
+            print("[INFO] Using cached search results (set GHOSTTUBE_NO_CACHE=1 to refetch)")
+            return results
+        results = search_youtube(query, max_results)
+        if results:  # Don't cache failed or empty searches
+            cache.set(key, results, expire=SEARCH_CACHE_TTL)
+    return results
+
+
+def build_ydl_opts(audio, video, download_transcripts,
                    audio_subdir, video_subdir, transcripts_subdir):
-    """Download audio, video, and transcripts with yt-dlp via Tor."""
-
-    # Base yt-dlp args for Tor proxy
-    tor_args = ["--proxy", TOR_PROXY]
-
-    if audio and video:
-        # Download audio separately
-        cmd_audio = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-x", "--audio-format", "mp3", "--audio-quality", "0",
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_audio, check=True)
-
-        # Download video separately
-        cmd_video = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-f", "bestvideo+bestaudio",
-            "--merge-output-format", "mp4",
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_video, check=True)
-
-    elif audio:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-x", "--audio-format", "mp3", "--audio-quality", "0",
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
-
-    elif video:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "-f", "bestvideo+bestaudio",
-            "--merge-output-format", "mp4",
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
-
+    """Specialize the yt-dlp option templates selected by the user for this run's folders."""
+    ydl_opts = {}
+    # With both selected, the mp3 is cut locally from the video (see download_media)
+    if audio and not video:
+        ydl_opts["audio"] = {**YDL_AUDIO_OPTS, "outtmpl": str(audio_subdir / OUTPUT_TEMPLATE)}
+    if video:
+        ydl_opts["video"] = {**YDL_VIDEO_OPTS, "outtmpl": str(video_subdir / OUTPUT_TEMPLATE)}
     if download_transcripts:
-        cmd_transcript = [
-            python_bin, "-m", "yt_dlp",
-            *tor_args,
-            "--skip-download",
-            "--write-auto-sub",
-            "--sub-lang", "en",
-            "--convert-subs", "txt",
-            "-o", str(transcripts_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_transcript, check=True)
+        ydl_opts["transcripts"] = {**YDL_TRANSCRIPT_OPTS,
+                                   "outtmpl": str(transcripts_subdir / OUTPUT_TEMPLATE)}
+    return ydl_opts
+
+
+def open_ydls(ydl_opts, proxy):
+    """Create one YoutubeDL per option set, all routed through the given Tor proxy."""
+    from yt_dlp import YoutubeDL  # Lives in the venv activated by check_prerequisites()
+    return {mode: YoutubeDL({**opts, "proxy": proxy}) for mode, opts in ydl_opts.items()}
+
+
+def close_ydls(ydls):
+    """Close the YoutubeDL instances from open_ydls() (their HTTP sessions and cookie jars)."""
+    for ydl in ydls.values():
+        ydl.close()
+
+
+def extract_mp3(video_path, audio_subdir):
+    """Transcode a downloaded video's audio track to mp3 locally, without a second download."""
+    mp3_path = audio_subdir / (Path(video_path).stem + ".mp3")
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(video_path),
+           "-vn", "-c:a", "libmp3lame", "-q:a", "0", str(mp3_path)]
+    # ffmpeg never reads a TTY here, and its output is dropped entirely when quiet
+    output = subprocess.DEVNULL if QUIET else None
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=output, stderr=output)
+    rc = proc.wait()
+    if rc:
+        raise subprocess.CalledProcessError(rc, cmd)
+
+
+def download_media(url, ydls, audio_from_video=None):
+    """Download audio, video, and transcripts with in-process yt-dlp via Tor."""
+    # Hit the extractor once; each mode then selects formats from the same metadata
+    info = next(iter(ydls.values())).extract_info(url, download=False, process=False)
+    # Playlist entries are lazy, and live/post-live formats hold bound extractor
+    # callbacks; neither survives a deepcopy, so those modes extract on their own
+    shareable = (info.get("_type") not in ("playlist", "multi_video")
+                 and info.get("live_status") not in ("is_live", "post_live"))
+    for mode, ydl in ydls.items():
+        shared = None
+        if shareable:
+            try:
+                shared = copy.deepcopy(info)
+            except TypeError:
+                shareable = False
+        if shared is None:
+            result = ydl.extract_info(url, download=True)
+        else:
+            result = ydl.process_ie_result(shared, download=True)
+        if mode == "video" and audio_from_video:
+            for entry in result.get("entries") or [result]:
+                for download in (entry or {}).get("requested_downloads", []):
+                    extract_mp3(download["filepath"], audio_from_video)
+
+
+def process_batch(batch_no, batches, urls, ydl_opts, audio_from_video=None):
+    """Download a batch of URLs on its own Tor circuit; returns [(url, error or None)]."""
+    from yt_dlp.utils import DownloadError
+
+    # Unique SOCKS credentials get a fresh circuit without NEWNYM or waiting
+    socks_addr = get_proxy(batch_no)
+    proxy = isolated_proxy(batch_no, socks_addr)
+    exit_ip = get_current_ip(proxy) if VERIFY_IP else None  # Costs a Tor round-trip
+    with PRINT_LOCK:
+        print(f"\n--- Batch [{batch_no}/{batches}]: {len(urls)} URLs ---")
+        print(f"🔒 Isolated Tor circuit via {socks_addr}" + (f" (exit IP: {exit_ip})" if exit_ip else ""))
+
+    ydls = open_ydls(ydl_opts, proxy)
+    results = []
+    try:
+        for url in urls:
+            with PRINT_LOCK:
+                print(f"\n📥 Downloading: {url}")
+            try:
+                try:
+                    download_media(url, ydls, audio_from_video)
+                except DownloadError as e:
+                    # Private/removed/geo-blocked videos fail on any exit; only a suspected
+                    # bad exit is retried, once, on a new circuit. New SOCKS credentials are
+                    # enough for that: a global NEWNYM would also move the other batches
+                    if not exit_suspect(e):
+                        raise
+                    proxy = isolated_proxy(f"{batch_no}-retry-{len(results)}", socks_addr)
+                    close_ydls(ydls)
+                    ydls = open_ydls(ydl_opts, proxy)
+                    with PRINT_LOCK:
+                        print(f"  [WARNING] Retrying on a new circuit: {url}")
+                    download_media(url, ydls, audio_from_video)
+                results.append((url, None))
+            except DownloadError as e:
+                if socks_addr != TOR_SOCKS_ADDR and exit_suspect(e):
+                    FAULTY_PROXIES[socks_addr] = time.time()  # Later batches skip this instance
+                results.append((url, f"Download failed: {e}"))
+            except subprocess.CalledProcessError as e:
+                results.append((url, f"Audio extraction failed: {e}"))
+            except Exception as e:
+                results.append((url, f"Unexpected error: {e}"))
+    finally:
+        close_ydls(ydls)
+    return results
 
 
 def main():
     print_header("YouTube Collector Agent with Tor")
     
     ensure_directories()
-    python_bin = check_prerequisites()
+    check_prerequisites()
     
     print_header("STEP 2: Search YouTube Content")
     query = input("🔍 Enter search query: ").strip()
@@ -298,7 +417,7 @@ def main():
     
     print(f"\n[INFO] Searching DuckDuckGo via Tor for: {query}")
     print(f"[INFO] Downloads will go into subfolders named '{query_dir}'")
-    results = search_youtube(query, max_results=10)
+    results = cached_search_youtube(query, max_results=10)
     
     if not results:
         print("[ERROR] No YouTube results found.")
@@ -311,42 +430,45 @@ def main():
     print_header("STEP 3: Saving URLs")
     save_urls_to_file(results)
     
-    print_header("STEP 4: Download Media with Identity Rotation")
+    print_header("STEP 4: Download Media with Circuit Isolation")
     audio, video, download_transcripts = get_download_options()
+    ydl_opts = build_ydl_opts(audio, video, download_transcripts,
+                              AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR)
     
-    print(f"\n[INFO] Starting downloads for {len(results)} URLs...")
-    print("[INFO] Rotating Tor identity before each download...\n")
+    tor_procs = start_tor_pool(TOR_POOL_SIZE) if TOR_POOL_SIZE > 0 else []
+    workers = max(MAX_WORKERS, len(TOR_POOL))  # At least one download per pool instance
     
-    for idx, url in enumerate(results, 1):
-        print(f"\n--- [{idx}/{len(results)}] ---")
-        
-        # Rotate Tor identity before each download
-        print("🔄 Rotating Tor identity...")
-        old_ip = get_current_ip()
-        if renew_tor_identity():
-            new_ip = get_current_ip()
-            print(f"  Old IP: {old_ip}")
-            print(f"  New IP: {new_ip}")
-            print(f"  ✓ Identity changed: {new_ip != old_ip}")
-        else:
-            print("  [WARNING] Proceeding with current identity")
-        
-        print(f"\n📥 Downloading: {url}")
-        try:
-            download_media(python_bin, url, audio, video, download_transcripts,
-                           AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR)
-            print(f"[✓] Download completed!")
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] Download failed: {e}")
-        except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+    total = len(results)
+    batches = [results[i:i + BATCH_SIZE] for i in range(0, total, BATCH_SIZE)]
+    print(f"\n[INFO] Starting downloads for {total} URLs "
+          f"({len(batches)} batches, {workers} in parallel)...")
+    print("[INFO] Each batch uses its own Tor circuit...\n")
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_batch, batch_no, len(batches), batch, ydl_opts,
+                            AUDIO_SUBDIR if audio and video else None)
+            for batch_no, batch in enumerate(batches, 1)
+        ]
+        done = 0
+        for future in as_completed(futures):
+            for url, error in future.result():
+                done += 1
+                with PRINT_LOCK:
+                    if error:
+                        print(f"[ERROR] ({done}/{total}) {url}: {error}")
+                    else:
+                        print(f"[✓] ({done}/{total}) Download completed: {url}")
+    
+    for proc in tor_procs:
+        proc.terminate()
     
     print_header("COMPLETE!")
     print(f"URLs saved to: {URLS_FILE}")
     print(f"Media saved to:\n  - Audio: {AUDIO_SUBDIR}\n  - Video: {VIDEO_SUBDIR}")
     if download_transcripts:
         print(f"  - Transcripts: {TRANSCRIPTS_SUBDIR}")
-    print("\nAll downloads completed with Tor identity rotation!")
+    print("\nAll downloads completed with Tor circuit isolation!")
     print("\n")
 
 
@@ -0,0 +1,182 @@
+"""
+Shared helpers for the YouTube collector scripts (ghosttube.py, yt-dlp-media-ripper.py).
+Holds the working-directory layout, console/input helpers, venv activation and the
+streaming DuckDuckGo result parser, so each entrypoint only keeps its own network
+setup (direct vs. Tor) and download pipeline.
+"""
+
+import os
+import re
+import site
+import subprocess
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+
+# --- Working directories ---
+SCRIPT_DIR = Path.cwd()
+VENV_DIR = SCRIPT_DIR / ".venv"
+VENV_BIN = VENV_DIR / ("Scripts" if os.name == "nt" else "bin")  # Platform picked once
+PYTHON_BIN = VENV_BIN / ("python.exe" if os.name == "nt" else "python")
+PIP_BIN = VENV_BIN / ("pip.exe" if os.name == "nt" else "pip")
+VENV_CFG = VENV_DIR / "pyvenv.cfg"
+if os.name != "nt":  # Only valid for a venv made by this X.Y, see venv_matches_python()
+    VENV_SITE_PACKAGES = VENV_DIR / "lib" / f"python{sys.version_info.major}.{sys.version_info.minor}" / "site-packages"
+else:
+    VENV_SITE_PACKAGES = VENV_DIR / "Lib" / "site-packages"
+OUTPUT_DIR = SCRIPT_DIR / "output"
+OUTPUT_AUDIO = OUTPUT_DIR / "audio"
+OUTPUT_VIDEO = OUTPUT_DIR / "video"
+OUTPUT_TRANSCRIPTS = OUTPUT_DIR / "transcripts"
+URLS_FILE = SCRIPT_DIR / "urls.txt"
+OUTPUT_TEMPLATE = "%(title)s.%(ext)s"
+
+# --- Precompiled patterns ---
+_SANITIZE_RE = re.compile(r'[<>:"/\\|?*]')  # Characters invalid in directory names
+_VENV_VERSION_RE = re.compile(r'^version(?:_info)?\s*=\s*(\d+\.\d+)', re.MULTILINE)  # pyvenv.cfg
+
+
+def env_int(name, default, minimum=1):
+    """Integer setting from the environment; exits with a clear message if it is invalid."""
+    raw = os.environ.get(name, str(default))
+    try:
+        value = int(raw)
+    except ValueError:
+        value = None
+    if value is None or value < minimum:
+        sys.exit(f"[ERROR] {name} must be an integer >= {minimum}, got {raw!r}")
+    return value
+
+
+def sanitize_query_for_dir(query):
+    """Sanitize search query to create a valid directory name."""
+    sanitized = _SANITIZE_RE.sub('', query).replace(' ', '_').strip()
+    if not sanitized:
+        sanitized = "search_results"
+    return sanitized
+
+
+def print_header(text):
+    print(f"\n{'='*60}")
+    print(f"  {text}")
+    print(f"{'='*60}\n")
+
+
+def ensure_directories():
+    """Create output and venv directories if they don't exist."""
+    for directory in [VENV_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS]:
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def venv_matches_python():
+    """True if the venv exists and was created by this Python's X.Y (read from pyvenv.cfg)."""
+    try:
+        match = _VENV_VERSION_RE.search(VENV_CFG.read_text(encoding="utf-8"))
+    except OSError:
+        return False
+    return PYTHON_BIN.exists() and bool(match) and match.group(1) == f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def create_venv():
+    """Create the venv, or rebuild it in place when another Python version made it."""
+    if not PYTHON_BIN.exists():
+        print("[INFO] Creating virtual environment...")
+    elif not venv_matches_python():
+        print(f"[INFO] Virtual environment was made by another Python, recreating it for "
+              f"{sys.version_info.major}.{sys.version_info.minor}...")
+    else:
+        print("✓ Virtual environment exists")
+        return
+    subprocess.check_call([sys.executable, "-m", "venv", "--clear", str(VENV_DIR)])
+
+
+def activate_venv():
+    """Add the venv's site-packages (same Python version, see create_venv()) to sys.path."""
+    site.addsitedir(str(VENV_SITE_PACKAGES))
+
+
+class ResultLinkParser(HTMLParser):
+    """Incremental parser collecting hrefs of DuckDuckGo result links (a.result__a)."""
+
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        attrs = dict(attrs)
+        if "result__a" in (attrs.get("class") or "").split():
+            self.hrefs.append(attrs.get("href") or "")
+
+
+def iter_result_links(response):
+    """Yield result hrefs as the streamed DuckDuckGo page arrives."""
+    response.encoding = response.encoding or "utf-8"  # iter_content only decodes with a known charset
+    parser = ResultLinkParser()
+    for chunk in response.iter_content(chunk_size=8192, decode_unicode=True):
+        parser.feed(chunk)
+        yield from parser.hrefs
+        parser.hrefs.clear()
+
+
+def unwrap_result_url(u):
+    """Turn a DuckDuckGo result href into the absolute target URL."""
+    if u.startswith("//"):
+        u = "https:" + u
+    if "uddg=" in u:
+        # Only the uddg parameter is needed: plain string ops, no urlparse/parse_qs/regex
+        u = unquote(u.split("uddg=", 1)[1].split("&", 1)[0])
+    return u
+
+
+def is_subtitle_error(error):
+    """True if a yt-dlp DownloadError came from the subtitle fetch (written before the media)."""
+    return "Unable to download video subtitles" in str(error)
+
+
+def exit_suspect(error):
+    """True if a DownloadError looks like a blocked exit (network error, HTTP 403/429, bot check)."""
+    from yt_dlp.networking.exceptions import HTTPError, TransportError  # Lives in the venv
+
+    cause = error.exc_info[1] if error.exc_info else None
+    while cause is not None:
+        if isinstance(cause, HTTPError):
+            return cause.status in (403, 429)
+        if isinstance(cause, TransportError):
+            return True
+        cause = getattr(cause, "cause", None) or cause.__cause__
+    return "Sign in to confirm" in str(error)  # YouTube's "not a bot" check on flagged exits
+
+
+def save_urls_to_file(urls):
+    """Overwrite urls.txt with current run results."""
+    with URLS_FILE.open("w", encoding="utf-8") as f:
+        for url in urls:
+            f.write(url + "\n")
+    print(f"[✓] Saved {len(urls)} URLs to {URLS_FILE}")
+
+
+def get_download_options():
+    """Ask user for download preferences."""
+    print("\nDownload options:")
+    print("1 - Audio only (MP3)")
+    print("2 - Video only (MP4)")
+    print("3 - Both audio and video")
+    choice = input("Choose 1, 2 or 3: ").strip()
+
+    if choice == "1":
+        audio, video = True, False
+    elif choice == "2":
+        audio, video = False, True
+    elif choice == "3":
+        audio, video = True, True
+    else:
+        print("[ERROR] Invalid choice. Defaulting to audio only.")
+        audio, video = True, False
+
+    transcripts_choice = input("Download transcripts if available? (y/n): ").strip().lower()
+    download_transcripts = transcripts_choice == "y"
+
+    return audio, video, download_transcripts
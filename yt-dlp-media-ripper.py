@@ -6,220 +6,269 @@ Combines DuckDuckGo search + yt-dlp download into one workflow.
 2. Searches DuckDuckGo for YouTube content
 3. Saves results to urls.txt (overwrites each run)
 4. Downloads media (audio, video, transcripts) using yt-dlp
+
+Environment settings (all optional):
+  RIPPER_JOBS=N       yt-dlp downloads running at once (default 4)
+  RIPPER_FRAGMENTS=N  DASH/HLS fragments fetched in parallel per file (default 4)
 """
 
-import os
 import sys
+import json
+import time
+import hashlib
+import contextlib
 import subprocess
+import threading
 import requests
-import re
-import urllib.parse
-from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote_plus
+from ripper_core import (
+    SCRIPT_DIR, VENV_DIR, VENV_SITE_PACKAGES, PIP_BIN, OUTPUT_AUDIO,
+    OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS, URLS_FILE, OUTPUT_TEMPLATE, env_int,
+    sanitize_query_for_dir, print_header, ensure_directories, venv_matches_python,
+    create_venv, activate_venv, save_urls_to_file, get_download_options,
+    iter_result_links, unwrap_result_url, is_subtitle_error,
+)
 
-# --- Working directories ---
-SCRIPT_DIR = Path.cwd()
-VENV_DIR = SCRIPT_DIR / ".venv"
-OUTPUT_DIR = SCRIPT_DIR / "output"
-OUTPUT_AUDIO = OUTPUT_DIR / "audio"
-OUTPUT_VIDEO = OUTPUT_DIR / "video"
-OUTPUT_TRANSCRIPTS = OUTPUT_DIR / "transcripts"
-URLS_FILE = SCRIPT_DIR / "urls.txt"
-
+# Pooled session: repeated searches reuse the TCP/TLS connection, transient errors are retried
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
 
-def sanitize_query_for_dir(query):
-    """Sanitize search query to create a valid directory name."""
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', query).replace(' ', '_').strip()
-    if not sanitized:
-        sanitized = "search_results"
-    return sanitized
+# --- Prerequisites ---
+PREREQS_MARKER = VENV_DIR / ".prereqs_ok"  # {"ts": last successful check, "py": sys.version}
+PREREQS_TTL = 86400  # Seconds a successful check is trusted
+REQUIRED_PACKAGES = [  # (pip install name, dist-info name)
+    ("requests", "requests"),
+    ("yt-dlp", "yt_dlp"),
+]
 
+# --- Search ---
+SEARCH_SCOPE = "site:youtube.com OR site:music.youtube.com"  # Appended to every query
+SEARCH_CACHE_DIR = SCRIPT_DIR / ".cache" / "search"
+SEARCH_CACHE_TTL = 3600  # Seconds before a cached query is fetched again
 
-def print_header(text):
-    print(f"\n{'='*60}")
-    print(f"  {text}")
-    print(f"{'='*60}\n")
+# --- Transcripts ---
+SUBTITLE_OPTS = ("writesubtitles", "writeautomaticsub", "subtitleslangs")  # Added by build_ydl_opts()
 
-
-def ensure_directories():
-    """Create output and venv directories if they don't exist."""
-    for directory in [VENV_DIR, OUTPUT_AUDIO, OUTPUT_VIDEO, OUTPUT_TRANSCRIPTS]:
-        directory.mkdir(parents=True, exist_ok=True)
+# --- Download concurrency ---
+MAX_JOBS = env_int("RIPPER_JOBS", 4)  # yt-dlp downloads running at once
+FRAGMENTS = env_int("RIPPER_FRAGMENTS", 4)  # DASH/HLS fragments fetched in parallel per file
+PRINT_LOCK = threading.Lock()  # Keep each worker's output together
 
 
 def check_prerequisites():
     """Check and install all prerequisites."""
     print_header("STEP 1: Checking Prerequisites")
     
-    if sys.version_info < (3, 7):
-        print("[ERROR] Python 3.7+ required")
+    if sys.version_info < (3, 8):  # importlib.metadata
+        print("[ERROR] Python 3.8+ required")
         sys.exit(1)
     print(f"✓ Python {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}")
     
-    if not (VENV_DIR / "bin" / "python").exists() and not (VENV_DIR / "Scripts" / "python.exe").exists():
-        print("[INFO] Creating virtual environment...")
-        subprocess.check_call([sys.executable, "-m", "venv", str(VENV_DIR)])
-    else:
-        print("✓ Virtual environment exists")
-    
-    python_bin = VENV_DIR / "bin" / "python" if os.name != "nt" else VENV_DIR / "Scripts" / "python.exe"
-    pip_bin = VENV_DIR / "bin" / "pip" if os.name != "nt" else VENV_DIR / "Scripts" / "pip.exe"
+    if prerequisites_cached():
+        print("✓ prerequisites cached")
+        activate_venv()  # yt-dlp runs in-process, so the venv's packages must be importable
+        print("\n[✓] All prerequisites checked and ready!\n")
+        return
     
-    # Check/install requests
-    try:
-        subprocess.run([pip_bin, "show", "requests"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        print("✓ requests library installed")
-    except subprocess.CalledProcessError:
-        print("[INFO] Installing requests library...")
-        subprocess.check_call([pip_bin, "install", "requests"])
+    create_venv()
     
-    # Check/install yt-dlp
-    try:
-        subprocess.run([pip_bin, "show", "yt-dlp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        print("✓ yt-dlp installed")
-    except subprocess.CalledProcessError:
-        print("[INFO] Installing yt-dlp...")
-        subprocess.check_call([pip_bin, "install", "--upgrade", "yt-dlp"])
+    # Check/install required packages (metadata read in-process, no pip or python -c)
+    missing = []
+    for install_name, dist_name in REQUIRED_PACKAGES:
+        installed = venv_version(dist_name)
+        if installed:
+            print(f"✓ {install_name} {installed} installed")
+        else:
+            missing.append(install_name)
     
-    print("[INFO] Ensuring pip is up-to-date...")
-    subprocess.run([pip_bin, "install", "--upgrade", "pip"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # One pip run (one resolver pass) upgrades pip and installs everything missing
+    if missing:
+        print(f"[INFO] Upgrading pip and installing {', '.join(missing)}...")
+        subprocess.check_call([PIP_BIN, "install", "--no-input", "--disable-pip-version-check",
+                               "--upgrade", "pip", *missing])
+    else:
+        print("[INFO] Ensuring pip is up-to-date...")
+        subprocess.run([PIP_BIN, "install", "--no-input", "--disable-pip-version-check",
+                        "--upgrade", "pip"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     print("✓ pip is up-to-date")
     
+    PREREQS_MARKER.write_text(json.dumps({"ts": time.time(), "py": sys.version}), encoding="utf-8")
+    activate_venv()  # yt-dlp runs in-process, so the venv's packages must be importable
     print("\n[✓] All prerequisites checked and ready!\n")
-    return str(python_bin)
+
+
+def prerequisites_cached():
+    """True if the last successful check is recent and was made with this Python."""
+    try:
+        state = json.loads(PREREQS_MARKER.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return (venv_matches_python() and state.get("py") == sys.version
+            and time.time() - state.get("ts", 0) < PREREQS_TTL)
+
+
+def venv_version(dist_name):
+    """Version of a distribution installed in the venv (read from its dist-info), or None."""
+    from importlib.metadata import distributions  # 3.8+, so only after the version check
+    dist = next(iter(distributions(name=dist_name, path=[str(VENV_SITE_PACKAGES)])), None)
+    return dist.version if dist else None
 
 
 def search_youtube(query, max_results=10):
     """Search DuckDuckGo for YouTube results."""
-    url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)} site:youtube.com OR site:music.youtube.com"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)} {SEARCH_SCOPE}"
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        pattern = r'<a[^>]+class="result__a"[^>]+href="([^"]+)"'
-        raw_urls = re.findall(pattern, response.text)
-        
-        clean_urls, seen = [], set()
-        for u in raw_urls:
-            if u.startswith("//"):
-                u = "https:" + u
-            if "uddg=" in u:
-                parsed = urllib.parse.urlparse(u)
-                qs = urllib.parse.parse_qs(parsed.query)
-                if "uddg" in qs:
-                    u = urllib.parse.unquote(qs["uddg"][0])
+        # Streamed and parsed as it arrives (same a.result__a extraction as ghosttube.py);
+        # leaving the block early closes the connection without reading the rest
+        with SESSION.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
             
-            if not ("youtube.com" in u or "youtu.be" in u):
-                continue
-            if u not in seen:
-                seen.add(u)
-                clean_urls.append(u)
-            if len(clean_urls) >= max_results:
-                break
+            candidates = (u for u in map(unwrap_result_url, iter_result_links(response))
+                          if "youtube.com" in u or "youtu.be" in u)
+            # A dict keeps first-seen order and drops repeats with one hash lookup per URL
+            clean_urls = {}
+            for u in candidates:
+                clean_urls[u] = None
+                if len(clean_urls) >= max_results:
+                    break  # Stop reading once enough unique URLs are found
         
-        return clean_urls
+        return list(clean_urls)
     except Exception as e:
         print(f"[ERROR] Search failed: {e}")
         return []
 
 
-def save_urls_to_file(urls):
-    """Overwrite urls.txt with current run results."""
-    with URLS_FILE.open("w", encoding="utf-8") as f:
-        for url in urls:
-            f.write(url + "\n")
-    print(f"[✓] Saved {len(urls)} URLs to {URLS_FILE}")
-
-
-def get_download_options():
-    """Ask user for download preferences."""
-    print("\nDownload options:")
-    print("1 - Audio only (MP3)")
-    print("2 - Video only (MP4)")
-    print("3 - Both audio and video")
-    choice = input("Choose 1, 2 or 3: ").strip()
-    
-    if choice == "1":
-        audio, video = True, False
-    elif choice == "2":
-        audio, video = False, True
-    elif choice == "3":
-        audio, video = True, True
-    else:
-        print("[ERROR] Invalid choice. Defaulting to audio only.")
-        audio, video = True, False
-    
-    transcripts_choice = input("Download transcripts if available? (y/n): ").strip().lower()
-    download_transcripts = transcripts_choice == "y"
+def cached_search_youtube(query, max_results=10):
+    """search_youtube() with results cached as JSON for SEARCH_CACHE_TTL seconds."""
+    # The scope is part of the key so changing the site filters never returns stale hits
+    key = hashlib.sha1(f"{query}|{SEARCH_SCOPE}|{max_results}".encode()).hexdigest()
+    cache_file = SEARCH_CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < SEARCH_CACHE_TTL:
+            with cache_file.open(encoding="utf-8") as f:
+                results = json.load(f)
+            print("[INFO] Using cached search results")
+            return results
+    except (OSError, ValueError):
+        pass  # Missing, unreadable or corrupt cache entry: search again
     
-    return audio, video, download_transcripts
+    results = search_youtube(query, max_results)
+    if results:  # Don't cache failed or empty searches
+        SEARCH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with cache_file.open("w", encoding="utf-8") as f:
+            json.dump(results, f)
+    return results
 
 
-def download_media(python_bin, url, audio, video, download_transcripts,
+def build_ydl_opts(audio, video, download_transcripts,
                    audio_subdir, video_subdir, transcripts_subdir):
-    """Download audio, video, and transcripts with yt-dlp."""
+    """Build the yt-dlp option sets (audio, video) selected by the user."""
+    base_opts = {
+        "quiet": True, "noprogress": True,  # Parallel progress bars would interleave
+        "concurrent_fragment_downloads": FRAGMENTS,
+    }
+    ydl_opts = {}
+    if audio:
+        ydl_opts["audio"] = {
+            **base_opts,
+            "format": "bestaudio/best",
+            "postprocessors": [{"key": "FFmpegExtractAudio",
+                                "preferredcodec": "mp3", "preferredquality": "0"}],
+            "outtmpl": str(audio_subdir / OUTPUT_TEMPLATE),
+        }
+    if video:
+        ydl_opts["video"] = {
+            **base_opts,
+            "format": "bestvideo+bestaudio",
+            "merge_output_format": "mp4",
+            "outtmpl": str(video_subdir / OUTPUT_TEMPLATE),
+        }
+    if download_transcripts and ydl_opts:
+        # Subtitles ride along with one media run instead of a separate pass
+        mode = "video" if video else "audio"
+        opts = ydl_opts[mode]
+        opts.update({
+            "writesubtitles": True,
+            "writeautomaticsub": True,
+            "subtitleslangs": ["en"],
+            "outtmpl": {"default": opts["outtmpl"],
+                        "subtitle": str(transcripts_subdir / OUTPUT_TEMPLATE)},
+        })
+        # yt-dlp can only convert subtitles to srt/vtt/ass/lrc
+        opts["postprocessors"] = [{"key": "FFmpegSubtitlesConvertor", "format": "srt",
+                                   "when": "before_dl"}, *opts.get("postprocessors", [])]
+    return ydl_opts
 
-    if audio and video:
-        # Download audio separately
-        cmd_audio = [
-            python_bin, "-m", "yt_dlp",
-            "-x", "--audio-format", "mp3", "--audio-quality", "0",
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_audio, check=True)
 
-        # Download video separately
-        cmd_video = [
-            python_bin, "-m", "yt_dlp",
-            "-f", "bestvideo+bestaudio",
-            "--merge-output-format", "mp4",
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_video, check=True)
+def without_subtitles(opts):
+    """Copy of a mode's options with the transcript parts build_ydl_opts() added removed."""
+    opts = {key: value for key, value in opts.items() if key not in SUBTITLE_OPTS}
+    opts["outtmpl"] = opts["outtmpl"]["default"]
+    opts["postprocessors"] = [pp for pp in opts["postprocessors"]
+                              if pp["key"] != "FFmpegSubtitlesConvertor"]
+    return opts
 
-    elif audio:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            "-x", "--audio-format", "mp3", "--audio-quality", "0",
-            "-o", str(audio_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
 
-    elif video:
-        cmd = [
-            python_bin, "-m", "yt_dlp",
-            "-f", "bestvideo+bestaudio",
-            "--merge-output-format", "mp4",
-            "-o", str(video_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd, check=True)
+def download_mode(mode, opts, urls):
+    """Run one mode's download over the URL list; returns an error message, or None."""
+    from yt_dlp import YoutubeDL  # Lives in the venv activated by check_prerequisites()
+    from yt_dlp.utils import DownloadError
 
-    if download_transcripts:
-        cmd_transcript = [
-            python_bin, "-m", "yt_dlp",
-            "--skip-download",
-            "--write-auto-sub",
-            "--sub-lang", "en",
-            "--convert-subs", "txt",
-            "-o", str(transcripts_subdir / "%(title)s.%(ext)s"),
-            url
-        ]
-        subprocess.run(cmd_transcript, check=True)
+    failed = 0
+    # One YoutubeDL for the whole batch (extractor and postprocessor setup happen once), but
+    # one call per URL so each input URL's outcome is known, playlists included
+    try:
+        with contextlib.ExitStack() as stack:
+            ydl = stack.enter_context(YoutubeDL(opts))
+            media_ydl = None  # Same options minus transcripts, opened on the first subtitle error
+            for url in urls:
+                try:
+                    try:
+                        info = ydl.extract_info(url, download=True)
+                    except DownloadError as e:
+                        if not is_subtitle_error(e):
+                            raise
+                        # Subtitles are fetched first, so e.g. a timedtext 429 skipped the media
+                        # too; transcripts are best-effort, the media is not
+                        with PRINT_LOCK:
+                            print(f"[WARNING] {mode}: no transcript for {url}, downloading media only")
+                        if media_ydl is None:
+                            media_ydl = stack.enter_context(YoutubeDL(without_subtitles(opts)))
+                        info = media_ydl.extract_info(url, download=True)
+                except DownloadError as e:
+                    failed += 1
+                    with PRINT_LOCK:
+                        print(f"[ERROR] {mode}: {url} failed: {e}")
+                    continue
+                with PRINT_LOCK:
+                    print(f"[✓] {mode}: {(info or {}).get('title') or url}")
+    except Exception as e:
+        return f"{mode}: unexpected error: {e}"
+    return f"{mode}: {failed}/{len(urls)} downloads failed" if failed else None
+
+
+def download_batch(ydl_opts, urls):
+    """Download a batch of URLs, all selected modes at once; returns an error message, or None."""
+    # Audio and video runs write to different folders and don't depend on each other,
+    # so one can use the network while the other is transcoding
+    with ThreadPoolExecutor(max_workers=len(ydl_opts)) as executor:
+        futures = [executor.submit(download_mode, mode, opts, urls)
+                   for mode, opts in ydl_opts.items()]
+        errors = [error for error in (f.result() for f in futures) if error]
+    return "; ".join(errors) or None
 
 
 def main():
     print_header("YouTube Collector Agent")
     
     ensure_directories()
-    python_bin = check_prerequisites()
+    check_prerequisites()
     
     print_header("STEP 2: Search YouTube Content")
     query = input("🔍 Enter search query: ").strip()
@@ -236,7 +285,7 @@ def main():
     
     print(f"\n[INFO] Searching DuckDuckGo for: {query}")
     print(f"[INFO] Downloads will go into subfolders named '{query_dir}'")
-    results = search_youtube(query, max_results=10)
+    results = cached_search_youtube(query, max_results=10)
     
     if not results:
         print("[ERROR] No YouTube results found.")
@@ -252,18 +301,23 @@ def main():
     print_header("STEP 4: Download Media")
     audio, video, download_transcripts = get_download_options()
     
-    print(f"\n[INFO] Starting downloads for {len(results)} URLs...\n")
+    ydl_opts = build_ydl_opts(audio, video, download_transcripts,
+                              AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR)
+    # One batch per worker: each sets up yt-dlp once and works through its share
+    total = len(results)
+    batches = [results[i::MAX_JOBS] for i in range(min(MAX_JOBS, total))]
+    print(f"\n[INFO] Starting downloads for {total} URLs "
+          f"({len(batches)} batches in parallel)...\n")
     
-    for idx, url in enumerate(results, 1):
-        print(f"\n--- [{idx}/{len(results)}] Processing: {url} ---")
-        try:
-            download_media(python_bin, url, audio, video, download_transcripts,
-                           AUDIO_SUBDIR, VIDEO_SUBDIR, TRANSCRIPTS_SUBDIR)
-            print(f"[✓] Completed!")
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] Download failed: {e}")
-        except Exception as e:
-            print(f"[ERROR] Unexpected error: {e}")
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        futures = {executor.submit(download_batch, ydl_opts, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            batch, error = futures[future], future.result()
+            with PRINT_LOCK:
+                if error:
+                    print(f"[ERROR] ({done}/{len(batches)}) Batch of {len(batch)} URLs: {error}")
+                else:
+                    print(f"[✓] ({done}/{len(batches)}) Batch of {len(batch)} URLs completed!")
     
     print_header("COMPLETE!")
     print(f"URLs saved to: {URLS_FILE}")